@@ -1,23 +1,93 @@
 # Overview: --upload-file, --start-file, --list-files, --delete-files, --delete-larger, --sort, --force
-from websocket import create_connection
-import requests
+from websocket import create_connection, WebSocketConnectionClosedException, WebSocketTimeoutException
 import json
+# orjson is optional; it parses the large fileInfo frames several times faster.
+# Its dumps() returns bytes, which ws.send() transmits unchanged as a text frame.
+try:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps = orjson.dumps
+except ModuleNotFoundError:
+    json_loads = json.loads
+    json_dumps = json.dumps
 import time
 from datetime import datetime
-from requests_toolbelt.multipart.encoder import MultipartEncoder, MultipartEncoderMonitor
+from collections import namedtuple
+from operator import attrgetter
+import atexit
+import math
 import os
+import select
+import socket
+import ssl
 import sys
 
+GCODE_FIRST_BYTES = frozenset(b"gGmMtT;")
+GCODE_WORD_PREFIXES = (b"start", b"end", b"init")
+# Shared session so repeated HTTP calls reuse one keep-alive connection.
+# requests is only needed for uploads, so it is imported on first use.
+_http_session = None
+
+def get_http_session():
+    global _http_session
+    if _http_session is None:
+        import requests
+        _http_session = requests.Session()
+        _http_session.headers.update({"User-Agent": "Mozilla/5.0"})
+    return _http_session
+
+# Every possible 50-character progress bar, indexed by the number of filled cells.
+# Stored pre-encoded so redraws can go straight to sys.stdout.buffer.
+PROGRESS_BARS = [(('█' * i) + ('░' * (50 - i))).encode("utf-8") for i in range(51)]
+UPLOAD_BOUNDARY = "----WebKitFormBoundaryMSFQsbe7RlEsWyBy"
+
+class MultipartFileBody:
+    # Minimal multipart/form-data body that streams a single file straight from its handle.
+    # Iterating yields 1 MiB chunks (far fewer syscalls than 8 KiB reads), and len makes
+    # requests send a fixed Content-Length instead of chunked encoding.
+    chunk_size = 1 << 20
+
+    def __init__(self, file_data, filename, file_size, content_type, callback=None):
+        self.head = (
+            f"--{UPLOAD_BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode("utf-8")
+        self.tail = f"\r\n--{UPLOAD_BOUNDARY}--\r\n".encode("utf-8")
+        self.file_data = file_data
+        self.len = len(self.head) + file_size + len(self.tail)
+        self.content_type = f"multipart/form-data; boundary={UPLOAD_BOUNDARY}"
+        self.bytes_read = 0
+        self.callback = callback
+
+    def _sent(self, chunk):
+        self.bytes_read += len(chunk)
+        if self.callback:
+            self.callback(self)
+        return chunk
+
+    def __iter__(self):
+        yield self._sent(self.head)
+        while True:
+            chunk = self.file_data.read(self.chunk_size)
+            if not chunk:
+                break
+            yield self._sent(chunk)
+        yield self._sent(self.tail)
+
 def upload_file(ip, local_file_path):
     def is_valid_gcode(path):
         try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                for _ in range(10):
-                    line = f.readline().strip().lower()
-                    if not line:
-                        continue
-                    if line.startswith(("g", "m", ";", "t", "start", "end", "init")):
-                        return True
+            # The header is all we need, so scan one small binary chunk without decoding
+            with open(path, 'rb') as f:
+                head = f.read(4096)
+            for line in head.split(b"\n")[:10]:
+                line = line.lstrip()
+                if not line:
+                    continue
+                # Most lines are decided by their first byte; only the word prefixes need lower()
+                if line[0] in GCODE_FIRST_BYTES or line[:5].lower().startswith(GCODE_WORD_PREFIXES):
+                    return True
             return False
         except Exception as e:
             print(f"Warning: Could not read file: {e}")
@@ -42,33 +112,35 @@ def upload_file(ip, local_file_path):
 
     print(f"Uploading '{filename}' to {url}...")
 
+    # Progress goes to the binary layer, so flush pending text output first
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+
     with open(local_file_path, 'rb') as file_data:
-        encoder = MultipartEncoder(
-            fields={
-                "file": (filename, file_data, "text/x.gcode")
-            },
-            boundary="----WebKitFormBoundaryMSFQsbe7RlEsWyBy"
-        )
+        last_percent = -1
 
         def progress_callback(monitor):
+            nonlocal last_percent
             uploaded = monitor.bytes_read
-            progress = int(uploaded / monitor.len * 50)
-            bar = f"{'█' * progress}{'░' * (50 - progress)}"
             percent = int((uploaded / monitor.len) * 100)
-            sys.stdout.write(f"\r{bar} {percent:3d}%")
-            sys.stdout.flush()
+            # Only redraw when the visible percentage changes
+            if percent == last_percent:
+                return
+            last_percent = percent
+            progress = int(uploaded / monitor.len * 50)
+            out.write(b"\r" + PROGRESS_BARS[progress] + b" %3d%%" % percent)
+            out.flush()
 
-        monitor = MultipartEncoderMonitor(encoder, progress_callback)
+        body = MultipartFileBody(file_data, filename, file_size, "text/x.gcode", progress_callback)
 
         headers = {
-            "Content-Type": monitor.content_type,
-            "User-Agent": "Mozilla/5.0",
+            "Content-Type": body.content_type,
             "Accept": "application/json, text/plain, */*",
             "Origin": f"http://{ip}",
             "Referer": f"http://{ip}/",
         }
 
-        response = requests.post(url, data=monitor, headers=headers)
+        response = get_http_session().post(url, data=body, headers=headers)
 
     print()  # newline after progress bar
 
@@ -87,8 +159,13 @@ def upload_file(ip, local_file_path):
         print("Response:", response.text)
 
 def extract_fileinfo_field(message):
+    # Status broadcasts interleave with the reply; a substring test skips parsing them.
+    # Binary frames arrive as bytes, which both JSON parsers accept directly.
+    key = b'"retGcodeFileInfo"' if isinstance(message, bytes) else '"retGcodeFileInfo"'
+    if key not in message:
+        return None
     try:
-        parsed = json.loads(message)
+        parsed = json_loads(message)
         if "retGcodeFileInfo" in parsed:
             info = parsed["retGcodeFileInfo"].get("fileInfo", "")
             return info
@@ -96,109 +173,248 @@ def extract_fileinfo_field(message):
         pass
     return None
 
-def delete_file(ws_url, path, name):
+def delete_file(ws, path, name):
+    # Send one delete on an already open connection; the caller reaps the acks
     payload = {
         "method": "set",
         "params": {
             "opGcodeFile": f"deleteprt:{path}/{name}"
         }
     }
-    send_ws_command(ws_url, payload, expect_response=False, silent=True)
+    # Only wait if the socket buffer is full instead of a fixed sleep per file
+    select.select([], [ws.sock], [], 5)
+    ws.send(json_dumps(payload))
+
+# One connection per ws_url for the life of the process, so chained operations share a handshake
+_ws_pool = {}
+
+def get_ws(ws_url, timeout=5):
+    ws = _ws_pool.get(ws_url)
+    if ws is None or not ws.connected:
+        ws = create_connection(
+            ws_url,
+            timeout=timeout,
+            sockopt=((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),)
+        )
+        _ws_pool[ws_url] = ws
+    else:
+        ws.settimeout(timeout)
+    return ws
 
-def send_ws_command(ws_url, payload, expect_response=True, timeout=5, silent=False):
-    try:
-        ws = create_connection(ws_url, timeout=timeout)
-        if not silent:
+def drop_ws(ws_url):
+    # Close and forget a pooled connection, e.g. after an error left it in an unknown state
+    ws = _ws_pool.pop(ws_url, None)
+    if ws is not None:
+        try:
+            ws.close()
+        except Exception:
+            pass
+
+def close_all_ws():
+    for ws_url in list(_ws_pool):
+        drop_ws(ws_url)
+
+atexit.register(close_all_ws)
+
+def send_on(ws, payload, expect_response=True, silent=False):
+    # Send a command on an already open connection
+    if not silent:
+        print("Sending command...")
+    ws.send(json_dumps(payload))
+
+    if expect_response:
+        try:
+            response = ws.recv()
+            if not silent:
+                print("Response:", response)
+        except:
+            if not silent:
+                print("No response received.")
+
+class PrinterSession:
+    # Context manager around one pooled connection for a sequence of commands.
+    # The stale-message drain runs at most once per session, and only when a reply is expected.
+    def __init__(self, ws_url, timeout=5, silent=False):
+        self.ws_url = ws_url
+        self.timeout = timeout
+        self.silent = silent
+        self.ws = None
+        self.drained = False
+
+    def __enter__(self):
+        self.ws = get_ws(self.ws_url, timeout=self.timeout)
+        if not self.silent:
             print("Connected to printer.")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep healthy connections in the pool, throw away broken ones
+        if exc_type is not None:
+            drop_ws(self.ws_url)
+        return False
 
-        start_time = time.time()
-        while time.time() - start_time < 2:
-            try:
-                msg = ws.recv()
-                if msg.strip() and not silent:
+    def drain(self):
+        # Non-blocking: read whatever is already buffered and stop as soon as the socket is empty
+        self.ws.settimeout(0)
+        try:
+            while True:
+                msg = self.ws.recv()
+                if msg.strip() and not self.silent:
                     print("Received:", msg)
-            except:
-                break
+        except (BlockingIOError, WebSocketTimeoutException, ssl.SSLWantReadError):
+            pass
+        finally:
+            self.ws.settimeout(self.timeout)
+        self.drained = True
+
+    def send(self, payload, expect_response=True):
+        # Fire-and-forget commands don't care about stale messages, so skip the drain
+        if expect_response and not self.drained:
+            self.drain()
+        send_on(self.ws, payload, expect_response=expect_response, silent=self.silent)
 
-        if not silent:
-            print("Sending command...")
-        ws.send(json.dumps(payload))
-
-        if expect_response:
-            try:
-                response = ws.recv()
-                if not silent:
-                    print("Response:", response)
-            except:
-                if not silent:
-                    print("No response received.")
-        ws.close()
+def send_ws_command(ws_url, payload, expect_response=True, timeout=5, silent=False):
+    try:
+        with PrinterSession(ws_url, timeout=timeout, silent=silent) as session:
+            session.send(payload, expect_response=expect_response)
     except Exception as e:
         if not silent:
             print("Connection error:", e)
 
-def list_files(ws_url, filter_keyword=None, sort_by="name", delete_over_size=None, force=False, delete_mode=False):
+def delete_files(ws, results, drain_timeout=1.0):
+    # Pipeline all delete commands on the same connection, then reap the acks
+    for path, name, *_ in results:
+        delete_file(ws, path, name)
+
+    # The printer keeps broadcasting status, so bound the drain by a deadline
+    previous_timeout = ws.gettimeout()
+    deadline = time.monotonic() + drain_timeout
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ws.settimeout(remaining)
+            ws.recv()
+    except Exception:
+        pass
+    finally:
+        # The connection goes back to the pool, don't leave it on a near-zero timeout
+        if ws.connected:
+            ws.settimeout(previous_timeout)
+
+FileEntry = namedtuple("FileEntry", "path name size_bytes layer_height timestamp filament_mm")
+
+def iter_entries(file_info, filter_keyword=None):
+    # fileInfo is "path:name:size:layer_height:timestamp:filament;..." for each file
+    _int = int
+    keyword = filter_keyword.lower() if filter_keyword else None
+    # One C-level scan of the whole string: if the keyword appears nowhere, nothing can match
+    if keyword and keyword not in file_info.lower():
+        return
+    for entry in file_info.split(';'):
+        if not entry:
+            continue
+        parts = entry.split(':', 6)
+        if len(parts) < 6:
+            continue
+        # Reject on the name before paying for the numeric conversions
+        if keyword and keyword not in parts[1].lower():
+            continue
+        yield FileEntry(parts[0], parts[1], _int(parts[2]), float(parts[3]), _int(parts[4]), _int(parts[5]))
+
+def has_file(file_info, filename):
+    # Compare the parsed name field: a plain substring test also hits sizes and timestamps
+    return any(entry.name == filename for entry in iter_entries(file_info, filename))
+
+# Short-lived cache so chained operations within one invocation don't re-query
+FILE_LIST_TTL = 2
+# The reply usually arrives within a second; this only bounds the wait when it never comes
+FILE_LIST_TIMEOUT = 5
+_file_list_cache = {}
+
+def fetch_file_info(ws, ws_url=None, timeout=FILE_LIST_TIMEOUT):
+    # Request the file list on an open connection and return the raw fileInfo string
+    if ws_url is not None:
+        cached = _file_list_cache.get(ws_url)
+        if cached and time.monotonic() - cached[0] < FILE_LIST_TTL:
+            return cached[1]
+
     payload = {
         "method": "get",
         "params": {
             "reqGcodeFile": 1
         }
     }
+    ws.send(json_dumps(payload))
+
+    file_info = None
+    previous_timeout = ws.gettimeout()
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        # Block until a frame arrives or the overall deadline passes
+        ws.settimeout(remaining)
+        try:
+            msg = ws.recv()
+        except (WebSocketTimeoutException, WebSocketConnectionClosedException):
+            break
+        except Exception:
+            continue
+        file_info = extract_fileinfo_field(msg)
+        # An empty string is a valid answer (no files), stop as soon as the reply is in
+        if file_info is not None:
+            break
+    ws.settimeout(previous_timeout)
+
+    if file_info is None:
+        return None
+
+    # Cache the raw string so each caller can apply its own keyword filter
+    if ws_url is not None:
+        _file_list_cache[ws_url] = (time.monotonic(), file_info)
+    return file_info
+
+def fetch_file_list(ws, ws_url=None, timeout=FILE_LIST_TIMEOUT, filter_keyword=None):
+    # Request the file list on an open connection and return the parsed entries
+    file_info = fetch_file_info(ws, ws_url, timeout)
+    if file_info is None:
+        return None
+    return list(iter_entries(file_info, filter_keyword))
+
+def list_files(ws_url, filter_keyword=None, sort_by="name", delete_over_size=None, force=False, delete_mode=False):
     try:
-        ws = create_connection(ws_url, timeout=5)
+        ws = get_ws(ws_url)
         print("Connected to printer.")
-        ws.send(json.dumps(payload))
         print("Requested file list, waiting for response...")
+        entries = fetch_file_list(ws, ws_url, filter_keyword=filter_keyword)
 
-        file_info = None
-        start_time = time.time()
-
-        while time.time() - start_time < 10:
-            try:
-                msg = ws.recv()
-                file_info = extract_fileinfo_field(msg)
-                if file_info:
-                    break
-            except Exception:
-                continue
-
-        if not file_info:
+        if entries is None:
             print("No file list received within timeout.")
-            ws.close()
             return
 
-        entries = file_info.split(';')
-        total_size = 0
         results = []
+        total_bytes = 0
 
         for entry in entries:
-            if not entry:
-                continue
-            parts = entry.split(':')
-            if len(parts) >= 6:
-                path = parts[0]
-                name = parts[1]
-                size_bytes = int(parts[2])
-                layer_height = float(parts[3])
-                timestamp = int(parts[4])
-                filament_mm = int(parts[5])
-                size_mb = size_bytes / 1048576
+            size_mb = entry.size_bytes / 1048576
 
-                if filter_keyword and filter_keyword.lower() not in name.lower():
-                    continue
-                if delete_over_size is not None and size_mb <= delete_over_size:
-                    continue
-                if delete_mode and delete_over_size is not None and size_mb <= delete_over_size:
-                    continue
+            if delete_over_size is not None and size_mb <= delete_over_size:
+                continue
+            if delete_mode and delete_over_size is not None and size_mb <= delete_over_size:
+                continue
 
-                results.append((path, name, size_bytes, layer_height, timestamp, filament_mm))
+            results.append(entry)
+            total_bytes += entry.size_bytes
 
         if sort_by == "size":
-            results.sort(key=lambda x: x[2], reverse=True)
+            results.sort(key=attrgetter("size_bytes"), reverse=True)
         elif sort_by == "time":
-            results.sort(key=lambda x: x[4], reverse=True)
+            results.sort(key=attrgetter("timestamp"), reverse=True)
         else:
-            results.sort(key=lambda x: x[1].lower())
+            results.sort(key=lambda x: x.name.lower())
 
         if results:
             print("\nMatching files:\n")
@@ -206,11 +422,11 @@ def list_files(ws_url, filter_keyword=None, sort_by="name", delete_over_size=Non
             print(f"{'-'*20}   {'-'*8}   {'-'*40}")
 
             for path, name, size_bytes, layer_height, timestamp, filament_mm in results:
-                size_mb = round(size_bytes / 1048576, 2)
+                size_mb = size_bytes / 1048576
                 dt = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
                 print(f"{dt}   {size_mb:6.2f} MB   {name}")
             print()
-            total_size_mb = sum(entry[2] for entry in results) / 1048576
+            total_size_mb = total_bytes / 1048576
             print(f"Total size: {total_size_mb:.2f} MB")
 
             if delete_mode:
@@ -218,63 +434,32 @@ def list_files(ws_url, filter_keyword=None, sort_by="name", delete_over_size=Non
                     confirm = input("\nDelete these files? [y/N]: ").strip().lower()
                     if confirm != "y":
                         print("Aborted.")
-                        ws.close()
                         return
                 print("\nDeleting files...")
-                for path, name, size_bytes, *_ in results:
-                    delete_file(ws_url, path, name)
-                    time.sleep(0.3)
+                delete_files(ws, results)
+                _file_list_cache.pop(ws_url, None)
                 print("Done.")
         else:
             print("No matching files found.")
-
-        ws.close()
     except Exception as e:
+        drop_ws(ws_url)
         print("Connection error:", e)
 
 def start_print(ws_url, filepath, countdown_minutes=1):
     filename = os.path.basename(filepath)
     print(f"Checking if the file '{filename}' exists on the printer...")
-    file_exists = False
     try:
-        payload = {
-            "method": "get",
-            "params": {
-                "reqGcodeFile": 1
-            }
-        }
-        ws = create_connection(ws_url, timeout=5)
-        ws.send(json.dumps(payload))
-        start_time = time.time()
-
-        file_info = None
-        while time.time() - start_time < 10:
-            try:
-                msg = ws.recv()
-                file_info = extract_fileinfo_field(msg)
-                if file_info:
-                    break
-            except Exception:
-                continue
+        ws = get_ws(ws_url)
+        file_info = fetch_file_info(ws, ws_url)
 
-        ws.close()
-
-        if not file_info:
+        if file_info is None:
             print("Error: Could not retrieve the file list from the printer.")
             return
 
-        entries = file_info.split(';')
-        for entry in entries:
-            if not entry:
-                continue
-            parts = entry.split(':')
-            if len(parts) >= 6:
-                name = parts[1]
-                if name == filename:
-                    file_exists = True
-                    break
+        file_exists = has_file(file_info, filename)
 
     except Exception as e:
+        drop_ws(ws_url)
         print(f"Error while checking file existence: {e}")
         return
 
@@ -286,13 +471,21 @@ def start_print(ws_url, filepath, countdown_minutes=1):
     countdown_seconds = countdown_minutes * 60
     print(f"Starting print in {countdown_minutes} minute(s)...")
 
-    for remaining in range(countdown_seconds, 0, -1):
+    sys.stdout.flush()
+    out = sys.stdout.buffer
+    # Count down against a single monotonic deadline and wake up exactly when the
+    # displayed second changes, so neither redraws nor oversleeping cause drift
+    deadline = time.monotonic() + countdown_seconds
+    while True:
+        time_left = deadline - time.monotonic()
+        if time_left <= 0:
+            break
+        remaining = math.ceil(time_left)
         minutes, seconds = divmod(remaining, 60)
         progress = int((countdown_seconds - remaining) / countdown_seconds * 50)
-        bar = f"{'█' * progress}{'░' * (50 - progress)}"
-        sys.stdout.write(f"\r{bar} {minutes:02}:{seconds:02} remaining...")
-        sys.stdout.flush()
-        time.sleep(1)
+        out.write(b"\r" + PROGRESS_BARS[progress] + b" %02d:%02d remaining..." % (minutes, seconds))
+        out.flush()
+        time.sleep(time_left - (remaining - 1))
 
     print("\nCountdown finished. Sending print command...")
     payload = {
@@ -301,4 +494,7 @@ def start_print(ws_url, filepath, countdown_minutes=1):
             "opGcodeFile": f"printprt:{filepath}"
         }
     }
+    # The connection from the file check sat unread through the countdown: it is full of stale
+    # broadcasts, or silently dead, so start the print on a fresh, drained one
+    drop_ws(ws_url)
     send_ws_command(ws_url, payload)
@@ -1,47 +1,34 @@
 #!/usr/bin/env python3
 import argparse
 import json
-import time
-import os
 import re
 import sys  # For progress display
 from io import BytesIO
-import curses
 from datetime import datetime
+from functools import lru_cache
+from importlib.util import find_spec
 
 # Check for required dependencies
-def check_dependencies():
-    missing_modules = []
-
-    try:
-        from websocket import create_connection
-    except ModuleNotFoundError:
-        missing_modules.append("websocket-client")
-
-    try:
-        import requests
-    except ModuleNotFoundError:
-        missing_modules.append("requests")
-
-    try:
-        from PIL import Image
-    except ModuleNotFoundError:
-        missing_modules.append("pillow")
-
-    try:
-        import curses
-    except ModuleNotFoundError:
-        missing_modules.append("windows-curses")  # For Windows compatibility
-
-    try:
-        import numpy
-    except ModuleNotFoundError:
-        missing_modules.append("numpy")
-
-    try:
-        from requests_toolbelt import MultipartEncoder
-    except ModuleNotFoundError:
-        missing_modules.append("requests-toolbelt")
+# (import name, pip package) - find_spec only locates the module, it doesn't execute it.
+# Everything beyond the WebSocket client is checked by the command that needs it.
+REQUIRED_MODULES = [
+    ("websocket", "websocket-client"),
+]
+UPLOAD_MODULES = [
+    ("requests", "requests"),
+]
+STATUS_MODULES = [
+    ("curses", "windows-curses"),  # For Windows compatibility
+]
+CAMERA_MODULES = [
+    ("requests", "requests"),
+    ("PIL", "pillow"),  # pillow-simd installs the same module and works too
+    ("numpy", "numpy"),
+]
+
+def check_dependencies(modules=REQUIRED_MODULES):
+    missing_modules = [package for module, package in modules
+                       if module not in sys.modules and find_spec(module) is None]
 
     if missing_modules:
         print("The following required modules are not installed:")
@@ -51,58 +38,22 @@ def check_dependencies():
         print(f"    pip install {' '.join(missing_modules)}")
         sys.exit(1)
 
-# Run the dependency check
-check_dependencies()
+# Run the dependency check when started as a script, importing the module skips it
+if __name__ == "__main__":
+    check_dependencies()
 
 # Import the modules after the dependency check
-from websocket import create_connection
-import requests
-from PIL import Image
-from media import fetch_photo2, fetch_video
-from fileops import upload_file, list_files, delete_file, start_print
-from status import live_status
+# media (Pillow/NumPy) and status (curses) are imported by the commands that use them
+from fileops import upload_file, list_files, start_print, send_ws_command
 
+@lru_cache(maxsize=1)
 def get_default_ip():
-    config_path = "config.json"
-    if os.path.exists(config_path):
-        with open(config_path, "r") as f:
-            config = json.load(f)
-            return config.get("default_ip")
-    return None
-
-def send_ws_command(ws_url, payload, expect_response=True, timeout=5, silent=False):
+    # Opening directly covers the existence check, no separate stat needed
     try:
-        ws = create_connection(ws_url, timeout=timeout)
-        if not silent:
-            print("Connected to printer.")
-
-        # Clear any initial messages from the WebSocket buffer
-        start_time = time.time()
-        while time.time() - start_time < 2:
-            try:
-                msg = ws.recv()
-                if msg.strip() and not silent:
-                    print("Received:", msg)
-            except:
-                break
-
-        if not silent:
-            print("Sending command...")
-        ws.send(json.dumps(payload))
-
-        # Wait for and print the response if expected
-        if expect_response:
-            try:
-                response = ws.recv()
-                if not silent:
-                    print("Response:", response)
-            except:
-                if not silent:
-                    print("No response received.")
-        ws.close()
-    except Exception as e:
-        if not silent:
-            print("Connection error:", e)
+        with open("config.json", "rb") as f:
+            return json.loads(f.read()).get("default_ip")
+    except FileNotFoundError:
+        return None
 
 def pause_print(ws_url):
     # Send a command to pause the current print
@@ -134,33 +85,6 @@ def stop_print(ws_url):
     }
     send_ws_command(ws_url, payload)
 
-# --- HELPER FUNCTION: Safely add strings to curses windows ---
-def safe_addstr(win, y, x, text, width_limit=0):
-    try:
-        h, w = win.getmaxyx()
-        if y < 0 or y >= h or x < 0:
-            return
-        effective_limit = w - x
-        if width_limit > 0:
-            effective_limit = min(effective_limit, width_limit)
-        if effective_limit <= 0:
-            return
-        text_str = str(text) if text is not None else ""
-        win.addstr(y, x, text_str[:effective_limit])
-    except curses.error:
-        pass
-
-def extract_fileinfo_field(message):
-    # Extract the file information field from a JSON message
-    try:
-        parsed = json.loads(message)
-        if "retGcodeFileInfo" in parsed:
-            info = parsed["retGcodeFileInfo"].get("fileInfo", "")
-            return info
-    except:
-        pass
-    return None
-
 def main():
     parser = argparse.ArgumentParser(description="Creality K1 printer WebSocket/HTTP control tool")
     parser.add_argument("--ip", help="IP address of the printer")
@@ -179,6 +103,7 @@ def main():
     parser.add_argument("--photo", action="store_true", help="Fetch and display a photo from the printer's camera using ANSI colors")
     parser.add_argument("--video", action="store_true", help="Fetch and display a video stream from the printer's camera (updates at the given interval)")
     parser.add_argument("--highres", action="store_true", help="Use Unicode half-blocks for higher vertical resolution in video/photo mode")
+    parser.add_argument("--colors256", action="store_true", help="Use the xterm 256-color palette instead of truecolor in video/photo mode (less terminal output)")
     parser.add_argument("--interval", type=float, default=0.5, help="Interval in seconds between video frames (default: 0.5)")
     args = parser.parse_args()
 
@@ -194,10 +119,11 @@ def main():
     # Overview of command-line arguments:
     # --ip, --upload-file, --start-file, --countdown, --pause, --resume, --stop,
     # --list-files, --sort, --delete-files, --delete-larger, --force,
-    # --status, --photo, --video, --interval
+    # --status, --photo, --video, --interval, --highres, --colors256
 
     # Handle the command-line arguments and execute the corresponding function
     if args.upload_file:
+        check_dependencies(UPLOAD_MODULES)
         upload_file(ip, args.upload_file)
     elif args.start_file:
         start_print(ws_url, default_gcode_path + args.start_file, countdown_minutes=args.countdown)
@@ -215,11 +141,17 @@ def main():
         # Pass delete_mode=True and the size limit for deletion
         list_files(ws_url, delete_over_size=args.delete_larger, sort_by=args.sort, force=args.force, delete_mode=True)
     elif args.status:
+        check_dependencies(STATUS_MODULES)
+        from status import live_status
         live_status(ws_url)
     elif args.photo:
-        fetch_photo2(ip, highres=args.highres)  # Use the updated photo display function
+        check_dependencies(CAMERA_MODULES)
+        from media import fetch_photo2
+        fetch_photo2(ip, highres=args.highres, colors256=args.colors256)  # Use the updated photo display function
     elif args.video:
-        fetch_video(ip, interval=args.interval, highres=args.highres)
+        check_dependencies(CAMERA_MODULES)
+        from media import fetch_video
+        fetch_video(ip, interval=args.interval, highres=args.highres, colors256=args.colors256)
     else:
         parser.print_help()
 
@@ -1,21 +1,178 @@
-# Overview: --photo, --video, --interval, --highres
+# Overview: --photo, --video, --interval, --highres, --colors256
 import requests
+from requests.adapters import HTTPAdapter
 from PIL import Image
 from io import BytesIO
+import queue
+import threading
 import numpy as np
 import shutil
 import os
 import sys
 import time
 
-def fetch_photo2(ip, highres=False):
+# Shared session so repeated snapshot requests reuse one keep-alive connection.
+# There is only ever one camera host, and no retries so an unreachable camera fails fast.
+http_session = requests.Session()
+http_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=0))
+
+# Every cell is a fixed-width escape with zero-padded 3-digit color values ("007" parses as 7),
+# so a frame is a constant template where only the digits change from frame to frame.
+DIGITS = np.array([list(b"%03d" % i) for i in range(256)], dtype=np.uint8)
+FG_TRUECOLOR = b"\033[38;2;000;000;000m"
+BG_TRUECOLOR = b"\033[48;2;000;000;000m"
+TRUECOLOR_DIGITS = (7, 11, 15)  # offsets of the R, G, B digits inside the escape
+FG_256 = b"\033[38;5;000m"
+BG_256 = b"\033[48;5;000m"
+PALETTE_DIGITS = 7
+# xterm 256-color mode: nearest 6x6x6 cube level (0, 95, 135, 175, 215, 255) per channel value
+CUBE_LEVELS = np.array([0, 95, 135, 175, 215, 255])
+CUBE_INDEX = np.abs(np.arange(256)[:, None] - CUBE_LEVELS).argmin(axis=1).astype(np.uint8)
+
+def build_palette_lut():
+    # Nearest xterm color (cube 16-231 or gray ramp 232-255) for every 5-bit-per-channel RGB value.
+    # Colors 0-15 are left out because terminals theme them. The cube is separable per channel and
+    # the nearest gray is the one closest to the channel mean, so both candidates are exact.
+    rgb = np.stack(np.meshgrid(*[np.arange(32) * 8 + 4] * 3, indexing="ij"), axis=-1)
+    cube = CUBE_INDEX[rgb]
+    cube_rgb = CUBE_LEVELS[cube]
+    gray = np.clip(np.rint((rgb.mean(axis=-1) - 8) / 10), 0, 23).astype(int)
+    gray_rgb = (8 + 10 * gray)[..., None]
+    cube_dist = ((rgb - cube_rgb) ** 2).sum(axis=-1)
+    gray_dist = ((rgb - gray_rgb) ** 2).sum(axis=-1)
+    cube_color = 16 + 36 * cube[..., 0] + 6 * cube[..., 1] + cube[..., 2]
+    return np.where(gray_dist < cube_dist, 232 + gray, cube_color).astype(np.uint8)
+
+PALETTE_LUT = build_palette_lut()
+
+def palette_index(img_array):
+    # One fancy-index per frame: the top 5 bits of each channel address the precomputed table
+    top = img_array >> 3
+    return PALETTE_LUT[top[..., 0], top[..., 1], top[..., 2]]
+HALF_BLOCK = "▄".encode("utf-8")
+ROW_END = b"\033[0m\n"
+CLEAR_SCREEN = b"\033[H\033[2J"
+# Unchanged gaps up to this many cells are redrawn rather than skipped with a cursor move
+SPAN_GAP = 3
+
+class FrameBuffer:
+    # One preallocated uint8 buffer holding a whole frame, shaped (terminal rows, row stride).
+    # The escape template is written once; render() only overwrites the color digits in place.
+    # keep marks the bytes that are actually sent: a cell with the same colors as its left
+    # neighbour drops its escapes and only emits the glyph, so flat areas cost one byte per cell.
+    def __init__(self, rows, cols, highres, colors256):
+        fg, bg = (FG_256, BG_256) if colors256 else (FG_TRUECOLOR, BG_TRUECOLOR)
+        if highres:
+            # Unicode half block: upper pixel as foreground, lower pixel as background
+            cell = fg + bg + HALF_BLOCK
+            self.slots = [(0, 0), (len(fg), 1)]  # (offset in cell, pixel row within the pair)
+            self.escape_len = len(fg + bg)
+        else:
+            cell = bg + b" "
+            self.slots = [(0, 0)]
+            self.escape_len = len(bg)
+        self.highres = highres
+        self.colors256 = colors256
+        self.stride = cols * len(cell) + len(ROW_END)
+        self.buf = np.empty((rows, self.stride), dtype=np.uint8)
+        self.cells = self.buf[:, :cols * len(cell)].reshape(rows, cols, len(cell))
+        self.cells[:] = np.frombuffer(cell, dtype=np.uint8)
+        self.buf[:, -len(ROW_END):] = np.frombuffer(ROW_END, dtype=np.uint8)
+        self.keep = np.ones(self.buf.shape, dtype=bool)
+        self.keep_cells = self.keep[:, :cols * len(cell)].reshape(rows, cols, len(cell))
+
+    def render(self, img_array):
+        rows = self.buf.shape[0]
+        for offset, pixel_row in self.slots:
+            if self.highres:
+                pixels = img_array[pixel_row:rows * 2:2]
+            else:
+                pixels = img_array
+            if self.colors256:
+                start = offset + PALETTE_DIGITS
+                self.cells[..., start:start + 3] = DIGITS[palette_index(pixels)]
+            else:
+                for channel, digits in enumerate(TRUECOLOR_DIGITS):
+                    start = offset + digits
+                    self.cells[..., start:start + 3] = DIGITS[pixels[..., channel]]
+        # Run-length the escapes: the first cell of every row always keeps its own
+        same_as_left = (self.cells[:, 1:] == self.cells[:, :-1]).all(axis=2)
+        self.keep_cells[:, 1:, :self.escape_len] = ~same_as_left[..., None]
+        return self.buf, self.keep
+
+_frame_buffers = {}
+
+def get_frame_buffer(img_array, highres, colors256):
+    # Reuse the buffer for as long as the frame size and mode stay the same
+    rows = img_array.shape[0] // 2 if highres else img_array.shape[0]
+    key = (rows, img_array.shape[1], highres, colors256)
+    frame_buffer = _frame_buffers.get(key)
+    if frame_buffer is None:
+        _frame_buffers.clear()
+        frame_buffer = _frame_buffers[key] = FrameBuffer(*key)
+    return frame_buffer
+
+def render_frame(img_array, highres=False, colors256=False):
+    # Fill the frame template in place and pack the kept bytes; no newline after the last row
+    buf, keep = get_frame_buffer(img_array, highres, colors256).render(img_array)
+    return buf[keep].data[:-1]
+
+def pixel_rows(img_array, highres):
+    # Group pixel rows per terminal row: (rows, pixel rows per cell, width, 3)
+    if highres:
+        rows = img_array.shape[0] // 2
+        return img_array[:rows * 2].reshape(rows, 2, *img_array.shape[1:])
+    return img_array[:, None]
+
+def changed_cells(prev_array, img_array, highres=False, colors256=False):
+    # (rows, cols) mask of terminal cells that look different. In 256-color mode compare the
+    # palette index, not the raw pixel, so noise that quantizes to the same color is ignored.
+    if colors256:
+        prev_array, img_array = palette_index(prev_array)[..., None], palette_index(img_array)[..., None]
+    return (pixel_rows(prev_array, highres) != pixel_rows(img_array, highres)).any(axis=(1, 3))
+
+def render_changed_spans(img_array, changed, highres=False, colors256=False):
+    # Only the changed runs of cells, each behind an absolute cursor move to its first cell
+    frame_buffer = get_frame_buffer(img_array, highres, colors256)
+    frame_buffer.render(img_array)
+    parts = []
+    for row in np.flatnonzero(changed.any(axis=1)):
+        cols = np.flatnonzero(changed[row])
+        breaks = np.flatnonzero(np.diff(cols) > SPAN_GAP)
+        starts = np.concatenate((cols[:1], cols[breaks + 1]))
+        ends = np.concatenate((cols[breaks], cols[-1:])) + 1
+        for start, end in zip(starts, ends):
+            parts.append(b"\033[%d;%dH" % (row + 1, start + 1))
+            keep = frame_buffer.keep_cells[row, start:end].copy()
+            keep[0] = True  # after the cursor move the left neighbour's colors aren't set
+            parts.append(frame_buffer.cells[row, start:end][keep].data)
+    parts.append(b"\033[0m")
+    return b"".join(parts)
+
+def image_to_array(img, img_width, img_height):
+    # Let the JPEG decoder scale down while decoding, so the remaining steps touch far fewer pixels.
+    # Convert first so the resize runs on plain 8-bit RGB; BOX (area average) is much cheaper than
+    # the default bicubic filter and looks the same once every pixel becomes one terminal cell.
+    img.draft("RGB", (img_width, img_height))
+    img = img.convert("RGB").resize((img_width, img_height), Image.BOX)
+    return np.asarray(img)  # read-only is fine, the renderer never writes to it
+
+def write_frame(frame):
+    # Flush pending text output, then hand the frame to the terminal in a single write
+    sys.stdout.flush()
+    sys.stdout.buffer.write(frame)
+    sys.stdout.buffer.flush()
+
+def fetch_photo2(ip, highres=False, colors256=False):
     url = f"http://{ip}:8080/?action=snapshot"
     try:
         print("Fetching photo from printer...")
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-
-        img = Image.open(BytesIO(response.content))
+        # Hand the socket stream to PIL instead of building response.content first.
+        # The raw stream isn't seekable, so PIL reads it into memory exactly once.
+        with http_session.get(url, timeout=5, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            img = Image.open(response.raw)
 
         terminal_size = shutil.get_terminal_size((80, 24))
         terminal_width = terminal_size.columns
@@ -27,95 +184,192 @@ def fetch_photo2(ip, highres=False):
             img_width = terminal_width
             img_height = int((img_width * 9 / 16) / 2)
 
-        img = img.resize((img_width, img_height))
-        img = img.convert("RGB")
-        img_array = np.array(img)
+        img_array = image_to_array(img, img_width, img_height)
 
-        if highres:
-            buffer = []
-            for y in range(0, img_height - 1, 2):
-                line = ""
-                for x in range(img_width):
-                    upper = img_array[y, x]
-                    lower = img_array[y + 1, x]
-                    line += (
-                        f"\033[38;2;{upper[0]};{upper[1]};{upper[2]}m"
-                        f"\033[48;2;{lower[0]};{lower[1]};{lower[2]}m"
-                        "▄"
-                    )
-                line += "\033[0m"
-                buffer.append(line)
-            print("\n".join(buffer), end="", flush=True)
-        else:
-            for row in img_array:
-                for pixel in row:
-                    r, g, b = pixel
-                    print(f"\033[48;2;{r};{g};{b}m ", end="")
-                print("\033[0m")
+        frame = render_frame(img_array, highres, colors256)
+        write_frame(frame)
+        if not highres:
+            write_frame(b"\n")
     except requests.exceptions.RequestException as e:
         print(f"Error fetching photo: {e}")
     except Exception as e:
         print(f"Error processing photo: {e}")
 
-def fetch_video(ip, interval=0.5, highres=False):
+def open_mjpeg_stream(ip):
+    # mjpg-streamer pushes multipart/x-mixed-replace JPEGs over one connection; None if unsupported
+    try:
+        response = http_session.get(f"http://{ip}:8080/?action=stream", timeout=5, stream=True)
+    except requests.exceptions.RequestException:
+        return None
+    if response.ok and response.headers.get("Content-Type", "").startswith("multipart/"):
+        response.raw.decode_content = True
+        return response
+    response.close()
+    return None
+
+def read_parts(raw, boundary):
+    # Body of every part of a multipart stream. mjpg-streamer sends a Content-Length per part, other
+    # streamers don't; then the body runs up to the next delimiter, minus the line break before it.
+    delimiter = b"--" + boundary
+    in_headers = False
+    length = None
+    body = None
+    while True:
+        line = raw.readline()
+        if not line:
+            return  # a part cut off by the end of the stream is incomplete, so it's dropped
+        if line.startswith(delimiter):
+            if body is not None:
+                data = b"".join(body)
+                yield data[:-2] if data.endswith(b"\r\n") else data
+            in_headers, length, body = True, None, None
+        elif in_headers:
+            if line.lower().startswith(b"content-length:"):
+                length = int(line[15:])
+            elif line in (b"\r\n", b"\n"):
+                in_headers = False
+                if length is not None:
+                    yield raw.read(length)
+                else:
+                    body = []
+        elif body is not None:
+            body.append(line)
+
+def iter_stream_frames(response, interval):
+    # A background thread reads every part as it arrives and keeps only the newest one, so a
+    # consumer slower than the camera always gets the current picture instead of working through
+    # a backlog. At most one frame is handed out per interval.
+    content_type = response.headers.get("Content-Type", "")
+    boundary = content_type.partition("boundary=")[2].split(";")[0].strip().strip('"')
+    latest = queue.Queue(maxsize=1)  # newest part, None at the end of the stream, or the read error
+
+    def offer(item):
+        # Replace whatever the consumer hasn't picked up yet; this is the only producer
+        while True:
+            try:
+                latest.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    latest.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def read():
+        try:
+            for data in read_parts(response.raw, boundary.encode("latin-1")):
+                offer(data)
+            offer(None)
+        except Exception as e:
+            offer(e)
+
+    # Daemon thread, like the snapshot worker: a read still blocked when the video stops is abandoned
+    threading.Thread(target=read, daemon=True).start()
+    next_frame = 0
+    try:
+        while True:
+            time.sleep(max(0, next_frame - time.monotonic()))
+            data = latest.get()
+            if data is None:
+                return
+            if isinstance(data, Exception):
+                raise data
+            next_frame = time.monotonic() + interval
+            yield data
+    finally:
+        response.close()
+
+def iter_snapshot_frames(ip, interval):
     url = f"http://{ip}:8080/?action=snapshot"
+    stopped = threading.Event()
+    next_start = queue.SimpleQueue()  # when the worker should start its next request
+    results = queue.Queue(maxsize=1)  # (data, fetch_time) or the exception the request raised
+
+    def fetch():
+        while True:
+            # Wait on the event rather than sleeping, so stopping the video doesn't block on this thread
+            if stopped.wait(max(0, next_start.get() - time.monotonic())):
+                return
+            started = time.monotonic()
+            try:
+                # Reuse the keep-alive connection instead of a new TCP handshake per frame
+                with http_session.get(url, timeout=5) as response:
+                    response.raise_for_status()
+                    results.put((response.content, time.monotonic() - started))
+            except Exception as e:
+                results.put(e)
+
+    # One request in flight at a time, fetched in the background while the caller decodes and
+    # draws the previous frame. It is started so that it lands about when the next frame is due.
+    # The worker is a daemon thread, so a request still running when the video stops is simply
+    # abandoned instead of holding up the exit until it times out.
+    threading.Thread(target=fetch, daemon=True).start()
+    try:
+        next_start.put(0)
+        while True:
+            result = results.get()
+            if isinstance(result, Exception):
+                raise result
+            data, fetch_time = result
+            next_start.put(time.monotonic() + interval - fetch_time)
+            yield data
+    finally:
+        stopped.set()
+        next_start.put(0)  # wake a worker that is waiting for its next start time
+
+def iter_video_frames(ip, interval):
+    stream = open_mjpeg_stream(ip)
+    if stream is not None:
+        try:
+            yield from iter_stream_frames(stream, interval)
+            reason = "ended"
+        except Exception as e:
+            reason = f"failed ({e})"
+        # The streamer can drop clients at any time (restart, client limit). The line under the frame
+        # is kept free, so the notice goes there without disturbing the picture.
+        print(f"\nCamera stream {reason}, continuing with snapshots.", end="")
+    # Older camera daemons only serve single snapshots
+    yield from iter_snapshot_frames(ip, interval)
+
+def fetch_video(ip, interval=0.5, highres=False, colors256=False):
+    if os.name == "nt":
+        os.system("")  # side effect: turns on escape sequence processing in the Windows console
     try:
+        frames = iter_video_frames(ip, interval)
         first_frame = True
         last_img_height = None
         last_img_width = None
-        while True:
+        for data in frames:
             terminal_size = shutil.get_terminal_size((80, 24))
-            img_width = terminal_size.columns
+            # The frame has to fit on screen: a taller one scrolls the terminal and every cursor move of
+            # the delta redraw lands on the wrong row. Narrow it to keep 16:9, leaving the last line free.
+            max_rows = max(1, terminal_size.lines - 1)
+            img_width = min(terminal_size.columns, int(max_rows * 32 / 9))
             if highres:
                 img_height = int((img_width * 9 / 16))  # doppelte Höhe für Unicode-Halbblock
             else:
                 img_height = int((img_width * 9 / 16) / 2)
 
-            if first_frame or last_img_height != img_height or last_img_width != img_width:
-                os.system("clear" if os.name == "posix" else "cls")
-                first_frame = False
-            else:
-                sys.stdout.write(f"\033[{img_height if not highres else img_height//2}F")
+            full_redraw = first_frame or last_img_height != img_height or last_img_width != img_width
+            first_frame = False
 
             last_img_height = img_height
             last_img_width = img_width
 
-            response = requests.get(url, timeout=5)
-            response.raise_for_status()
+            img = Image.open(BytesIO(data))
+            img_array = image_to_array(img, img_width, img_height)
 
-            img = Image.open(BytesIO(response.content))
-            img = img.resize((img_width, img_height))
-            img = img.convert("RGB")
-            img_array = np.array(img)
-
-            if highres:
-                # Unicode Halbblock: Je zwei Zeilen zu einer Terminalzeile zusammenfassen
-                buffer = []
-                for y in range(0, img_height - 1, 2):
-                    line = ""
-                    for x in range(img_width):
-                        upper = img_array[y, x]
-                        lower = img_array[y + 1, x]
-                        line += (
-                            f"\033[38;2;{upper[0]};{upper[1]};{upper[2]}m"
-                            f"\033[48;2;{lower[0]};{lower[1]};{lower[2]}m"
-                            "▄"
-                        )
-                    line += "\033[0m"
-                    buffer.append(line)
-                print("\n".join(buffer), end="", flush=True)
+            if full_redraw:
+                # Clear with an escape right before drawing, no clear/cls subprocess per resize
+                write_frame(CLEAR_SCREEN)
+                write_frame(render_frame(img_array, highres, colors256))
             else:
-                buffer = []
-                for row in img_array:
-                    line = ""
-                    for pixel in row:
-                        r, g, b = pixel
-                        line += f"\033[48;2;{r};{g};{b}m "
-                    line += "\033[0m"
-                    buffer.append(line)
-                print("\n".join(buffer), end="", flush=True)
-
-            time.sleep(interval)
+                # Most of the scene is static, so only rewrite the cells that changed
+                changed = changed_cells(prev_array, img_array, highres, colors256)
+                if changed.any():
+                    frame_rows = len(changed)
+                    write_frame(render_changed_spans(img_array, changed, highres, colors256) + b"\033[%d;1H" % frame_rows)
+            prev_array = img_array
     except KeyboardInterrupt:
         print("\nVideo stream stopped.")
     except requests.exceptions.RequestException as e:
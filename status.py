@@ -1,24 +1,126 @@
 # Overview: --status
 import curses
-import json
-from websocket import create_connection
+import os
+import select
+import selectors
+import sys
+from websocket import create_connection, ABNF, WebSocketException, WebSocketConnectionClosedException, WebSocketTimeoutException
+from fileops import json_loads  # orjson when installed, stdlib json otherwise
 import time
+from functools import lru_cache
+from math import isfinite
+
+UI_TIMEOUT = 0.25  # longest idle sleep, bounds how late a resize or a keepalive check can be
+# Ping a silent connection after PING_INTERVAL seconds, give up if nothing answers within PONG_TIMEOUT
+PING_INTERVAL = 20
+PONG_TIMEOUT = 10
+# A lost connection is retried after RECONNECT_MIN seconds, doubling up to RECONNECT_MAX between failures;
+# each attempt may hold the UI for at most RECONNECT_TIMEOUT
+RECONNECT_MIN = 1
+RECONNECT_MAX = 30
+RECONNECT_TIMEOUT = 3
+# Only JSON objects carry status fields; frames not starting like one (text heartbeats, "{}", arrays) aren't parsed
+OBJECT_START = b"{ \t\r\n"
+# Upper bound on frames handled per UI tick, so a flood can't starve key handling
+MAX_BATCH = 50
 
 def safe_addstr(win, y, x, text, width_limit=0):
+    h, w = win.getmaxyx()
+    if width_limit > 0:
+        w = min(w, x + width_limit)
+    addstr_clipped(win, h, w, y, x, text)
+
+# Same as safe_addstr for callers that keep the window size around, skips the getmaxyx call
+def addstr_clipped(win, h, w, y, x, text):
+    if y < 0 or y >= h or x < 0 or x >= w:
+        return
+    if type(text) is not str:  # every caller in the loop already passes str
+        text = str(text) if text is not None else ""
     try:
-        h, w = win.getmaxyx()
-        if y < 0 or y >= h or x < 0:
-            return
-        effective_limit = w - x
-        if width_limit > 0:
-            effective_limit = min(effective_limit, width_limit)
-        if effective_limit <= 0:
-            return
-        text_str = str(text) if text is not None else ""
-        win.addstr(y, x, text_str[:effective_limit])
+        win.addstr(y, x, text[:w - x])
     except curses.error:
         pass
 
+def is_number(val):
+    return isinstance(val, (int, float))
+
+def is_finite_number(val):
+    # NaN, the infinities and ints too big for a float can't be turned into a percentage or a duration
+    try:
+        return is_number(val) and isfinite(val)
+    except OverflowError:
+        return False
+
+def build_progress(progress_val, bar_len=30):
+    filled = int(progress_val / 100 * bar_len)
+    # Show percent first, then bar
+    return f"{progress_val}% [{'█' * filled}{'░' * (bar_len - filled)}]"
+
+# Every whole percentage the printer normally reports, built once
+PROGRESS_TEXT = tuple(build_progress(p) for p in range(101))
+
+def format_progress(val):
+    if not is_finite_number(val):
+        return "N/A"
+    # Clamped, so a bogus report can't ask for a bar billions of cells long
+    return PROGRESS_TEXT[min(max(int(val), 0), 100)]
+
+def format_plain(val):
+    return str(val) if val is not None else "N/A"
+
+def format_position(val):
+    return str(val) if val else "N/A"
+
+# The converted inputs of these are always float or None, so they can be memoised safely.
+# Temperatures and speeds hover around a handful of values during a print.
+@lru_cache(maxsize=128)
+def format_temp(val):
+    return f"{float(val):.2f}°C" if is_number(val) else "N/A"
+
+# Keyed on whole seconds; both time fields tick once per second and revisit the same values
+@lru_cache(maxsize=4096)
+def _hms(t):
+    m, s = divmod(t, 60)
+    h, m = divmod(m, 60)
+    return "%02d:%02d:%02d" % (h, m, s)  # measurably faster than the equivalent f-string
+
+MAX_DURATION = 10 ** 7  # seconds, about 115 days; anything longer is a bogus report
+
+def format_duration(val):
+    return _hms(int(val)) if is_finite_number(val) and 0 <= val < MAX_DURATION else "N/A"
+
+@lru_cache(maxsize=128)
+def format_material(val):
+    return f"{val / 1000:.2f} m" if is_number(val) else "N/A"
+
+@lru_cache(maxsize=128)
+def format_speed(val):
+    return f"{int(round(val))} mm/s" if is_number(val) else "N/A"
+
+# Nozzle Temp und Bed Temp können als Listen, int, float oder String kommen
+def to_float(val, old_val):
+    # Floats are the common case and only need the finiteness check; the rest is left to float()
+    if type(val) is not float:
+        if isinstance(val, list):
+            val = val[0] if val else None
+        try:
+            val = float(val)
+        except (TypeError, ValueError, OverflowError):
+            return old_val
+    # float() also accepts "nan", "inf" and "1e999", which the formatters can't round
+    return val if isfinite(val) else old_val
+
+def to_float_or_none(val, old_val=None):
+    if type(val) is not float:
+        try:
+            val = float(val)
+        except (TypeError, ValueError, OverflowError):
+            return None
+    return val if isfinite(val) else None
+
+def keep(val, old_val):
+    return val
+
 def live_status(ws_url):
     def draw_screen(stdscr):
         curses.curs_set(0)
@@ -40,9 +142,6 @@ def live_status(ws_url):
         fixed_info_win = curses.newwin(fixed_info_height, width, 0, 0)
         log_win = curses.newwin(log_height, width, fixed_info_height, 0)
 
-        log_win.scrollok(True)
-        log_win.idlok(True)
-
         stdscr.refresh()
         fixed_info_win.box()
         safe_addstr(fixed_info_win, 0, 2, " Printer Status ")
@@ -50,6 +149,15 @@ def live_status(ws_url):
         log_win.box()
         safe_addstr(log_win, 0, 2, " Logs ")
         log_win.refresh()
+        # Log lines scroll inside the border, so the box and title are drawn only here and on resize
+        log_body = log_win.derwin(log_height - 2, width - 2, 1, 1)
+        log_body.idlok(True)
+
+        # Geometry and the blanking string only change on resize
+        max_h_fixed, max_w_fixed = fixed_info_win.getmaxyx()
+        log_h, log_w = log_body.getmaxyx()
+        blank_line = " " * (max_w_fixed - 2)
+        label_width = 16  # values start at column 18
 
         info_keys = [
             "Progress",
@@ -65,8 +173,24 @@ def live_status(ws_url):
         ]
         raw_info_cache = {key: None for key in info_keys}
         formatted_info = {key: "N/A" for key in info_keys}
-        previous_formatted_info = {}
-        needs_redraw_fixed = True
+        needs_redraw_fixed = True  # repaint the whole status box, set for a fresh or resized window
+        dirty = set()  # values that changed since the last redraw
+        status_line_y = 2
+        info_rows = {key: i + 3 for i, key in enumerate(info_keys)}
+
+        # (message key, display key, raw value conversion, display formatter)
+        update_table = [
+            ("printProgress", "Progress", keep, format_progress),
+            ("TotalLayer", "Total Layers", keep, format_plain),
+            ("layer", "Current Layer", keep, format_plain),
+            ("nozzleTemp", "Nozzle Temp", to_float, format_temp),
+            ("bedTemp0", "Bed Temp", to_float, format_temp),
+            ("curPosition", "Position", keep, format_position),
+            ("printJobTime", "Print Time", keep, format_duration),
+            ("printLeftTime", "Time Left", keep, format_duration),
+            ("usedMaterialLength", "Material Used", to_float_or_none, format_material),
+            ("realTimeSpeed", "Speed", to_float_or_none, format_speed),
+        ]
 
         ws = None
         try:
@@ -81,174 +205,238 @@ def live_status(ws_url):
             stdscr.getch()
             return
 
-        while True:
-            key = stdscr.getch()
-            if key == ord('q'):
-                break
-            elif key == curses.KEY_RESIZE:
-                height, width = stdscr.getmaxyx()
-                fixed_info_height = 15
-                log_height = height - fixed_info_height
-                if log_height < 3:
-                    fixed_info_height = max(1, height - 3)
+        status_text = "Connected"
+        drawn_status = None
+        backoff = RECONNECT_MIN
+        reconnect_at = None
+        last_msg = None
+        last_log = None  # bottom log row and how many times in a row it arrived
+        log_repeats = 0
+        last_activity = time.monotonic()
+        ping_sent = None
+        # Sleep until a frame or a keypress arrives instead of waking up on a fixed tick
+        sel = selectors.DefaultSelector()
+        ws_sock = ws.sock  # kept apart, ws.sock is gone once the library notices the connection has closed
+        sel.register(ws_sock, selectors.EVENT_READ)
+        if os.name == "nt":
+            wait = 0.05  # the Windows console can't be selected on, keys have to be polled
+        else:
+            sel.register(sys.stdin, selectors.EVENT_READ)
+            wait = UI_TIMEOUT
+        key = -1
+        # Ctrl+C can land anywhere in a tick, waiting, receiving or drawing, so the whole loop is covered
+        try:
+            while True:
+                # curses may already hold more input behind the key just handled, so don't sleep then
+                timeout = 0 if key != -1 else wait
+                if sel.get_map():
+                    ready = sel.select(timeout=timeout)
+                else:
+                    # Windows while reconnecting: nothing is registered, and select() with no sockets fails there
+                    time.sleep(timeout)
+                    ready = []
+                key = stdscr.getch()
+                if key == ord('q'):
+                    break
+                elif key == curses.KEY_RESIZE:
+                    height, width = stdscr.getmaxyx()
+                    fixed_info_height = 15
                     log_height = height - fixed_info_height
-                try:
-                    fixed_info_win.resize(fixed_info_height, width)
-                    log_win.resize(log_height, width)
-                    log_win.mvwin(fixed_info_height, 0)
-                    stdscr.clear()
-                    stdscr.refresh()
-                    fixed_info_win.box()
-                    safe_addstr(fixed_info_win, 0, 2, " Printer Status ")
-                    log_win.box()
-                    safe_addstr(log_win, 0, 2, " Logs ")
-                    needs_redraw_fixed = True
-                    log_win.refresh()
-                except curses.error:
-                    pass
-                continue
-
-            log_entry_to_add = None
-            try:
-                msg = ws.recv()
-                if msg:
-                    try:
-                        data = json.loads(msg)
-                        log_entry_to_add = msg
-                    except json.JSONDecodeError:
-                        log_entry_to_add = f"Malformed JSON: {msg}"
-                        data = None
-                    if data:
-                        # Nozzle Temp und Bed Temp können als Listen, int, float oder String kommen
-                        def to_float(val, old_val):
-                            if isinstance(val, list):
-                                val = val[0] if val else None
-                            try:
-                                if isinstance(val, str):
-                                    return float(val) if val.replace('.', '', 1).isdigit() else old_val
-                                return float(val)
-                            except (TypeError, ValueError):
-                                return old_val
-
-                        raw_info_cache["Total Layers"] = data.get("TotalLayer", raw_info_cache["Total Layers"])
-                        raw_info_cache["Current Layer"] = data.get("layer", raw_info_cache["Current Layer"])
-                        raw_info_cache["Nozzle Temp"] = to_float(data.get("nozzleTemp", None), raw_info_cache["Nozzle Temp"])
-                        raw_info_cache["Bed Temp"] = to_float(data.get("bedTemp0", None), raw_info_cache["Bed Temp"])
-                        raw_info_cache["Progress"] = data.get("printProgress", raw_info_cache["Progress"])
-                        raw_info_cache["Position"] = data.get("curPosition", raw_info_cache["Position"])
-                        raw_info_cache["Print Time"] = data.get("printJobTime", raw_info_cache["Print Time"])
-                        raw_info_cache["Time Left"] = data.get("printLeftTime", raw_info_cache["Time Left"])
-                        # Defensive: Only convert if value is not a string
-                        def to_float_or_none(val):
-                            try:
-                                if isinstance(val, str):
-                                    return float(val) if val.replace('.', '', 1).isdigit() else None
-                                return float(val)
-                            except Exception:
-                                return None
-                        mat_used = data.get("usedMaterialLength", raw_info_cache["Material Used"])
-                        speed = data.get("realTimeSpeed", raw_info_cache["Speed"])
-                        raw_info_cache["Material Used"] = to_float_or_none(mat_used)
-                        raw_info_cache["Speed"] = to_float_or_none(speed)
-                        if raw_info_cache["Progress"] is not None and isinstance(raw_info_cache["Progress"], (int, float)):
-                            progress_val = int(raw_info_cache["Progress"])
-                            bar_len = 30
-                            filled = int(progress_val / 100 * bar_len)
-                            # Show percent first, then bar
-                            bar = f"{progress_val}% [{'█' * filled}{'░' * (bar_len - filled)}]"
-                            progress_str = bar
-                        else:
-                            progress_str = "N/A"
-                        formatted_info = {
-                            "Progress": progress_str,
-                            "Total Layers": raw_info_cache["Total Layers"] if raw_info_cache["Total Layers"] is not None else "N/A",
-                            "Current Layer": raw_info_cache["Current Layer"] if raw_info_cache["Current Layer"] is not None else "N/A",
-                            "Nozzle Temp": (
-                                f"{float(raw_info_cache['Nozzle Temp']):.2f}°C"
-                                if raw_info_cache["Nozzle Temp"] is not None and isinstance(raw_info_cache["Nozzle Temp"], (int, float))
-                                else "N/A"
-                            ),
-                            "Bed Temp": (
-                                f"{float(raw_info_cache['Bed Temp']):.2f}°C"
-                                if raw_info_cache["Bed Temp"] is not None and isinstance(raw_info_cache["Bed Temp"], (int, float))
-                                else "N/A"
-                            ),
-                            "Position": raw_info_cache["Position"] if raw_info_cache["Position"] else "N/A",
-                            "Print Time": (
-                                f"{int(raw_info_cache['Print Time'] // 3600):02}:{int((raw_info_cache['Print Time'] % 3600) // 60):02}:{int(raw_info_cache['Print Time'] % 60):02}"
-                                if raw_info_cache["Print Time"] is not None and isinstance(raw_info_cache["Print Time"], (int, float))
-                                else "N/A"
-                            ),
-                            "Time Left": (
-                                f"{int(raw_info_cache['Time Left'] // 3600):02}:{int((raw_info_cache['Time Left'] % 3600) // 60):02}:{int(raw_info_cache['Time Left'] % 60):02}"
-                                if raw_info_cache["Time Left"] is not None and isinstance(raw_info_cache["Time Left"], (int, float))
-                                else "N/A"
-                            ),
-                            "Material Used": (
-                                f"{raw_info_cache['Material Used'] / 1000:.2f} m"
-                                if raw_info_cache["Material Used"] is not None and isinstance(raw_info_cache["Material Used"], (int, float))
-                                else "N/A"
-                            ),
-                            "Speed": (
-                                f"{int(round(raw_info_cache['Speed']))} mm/s"
-                                if raw_info_cache["Speed"] is not None and isinstance(raw_info_cache["Speed"], (int, float))
-                                else "N/A"
-                            ),
-                        }
-                        if formatted_info != previous_formatted_info:
-                            needs_redraw_fixed = True
-                            previous_formatted_info = formatted_info.copy()
-            except KeyboardInterrupt:
-                safe_addstr(fixed_info_win, 2, 1, " " * (width - 2))
-                safe_addstr(fixed_info_win, 2, 1, " Stopping...")
-                fixed_info_win.refresh()
-                time.sleep(0.5)
-                break
-            except Exception as e:
-                log_entry_to_add = f"WebSocket/Other Error: {e}"
-                time.sleep(1)
-
-            if needs_redraw_fixed:
-                max_h_fixed, max_w_fixed = fixed_info_win.getmaxyx()
-                status_line_y = 2
-                safe_addstr(fixed_info_win, status_line_y, 1, " " * (max_w_fixed - 2))
-                safe_addstr(fixed_info_win, status_line_y, 2, "Status: Connected", max_w_fixed - 3)
-                data_start_y = 3
-                value_start_col = 18
-                for i, key in enumerate(info_keys):
-                    value = formatted_info[key]
-                    data_line_y = i + data_start_y
-                    if data_line_y < (max_h_fixed - 1):
-                        label_text = f"{key}:"
-                        safe_addstr(fixed_info_win, data_line_y, 1, " " * (max_w_fixed - 2))
-                        safe_addstr(fixed_info_win, data_line_y, 2, label_text)
-                        if value_start_col < max_w_fixed - 1:
-                            safe_addstr(fixed_info_win, data_line_y, value_start_col, value, max_w_fixed - value_start_col - 1)
-                    else:
-                        break
-                fixed_info_win.refresh()
-                needs_redraw_fixed = False
-
-            if log_entry_to_add:
-                current_log_h, current_log_w = log_win.getmaxyx()
-                if current_log_h >= 3 and current_log_w >= 4:
-                    log_win.scroll(1)
-                    add_y = current_log_h - 2
-                    add_x = 1
+                    if log_height < 3:
+                        fixed_info_height = max(1, height - 3)
+                        log_height = height - fixed_info_height
                     try:
-                        log_win.move(add_y, 0)
-                        log_win.clrtoeol()
+                        fixed_info_win.resize(fixed_info_height, width)
+                        log_win.resize(log_height, width)
+                        log_win.mvwin(fixed_info_height, 0)
+                        # The log lines are kept, but a grown window would still show its old border inside
+                        if log_w + 2 < width:
+                            log_win.vline(0, log_w + 1, " ", log_height)
+                        if log_h + 2 < log_height:
+                            log_win.hline(log_h + 1, 0, " ", width)
+                        max_h_fixed, max_w_fixed = fixed_info_win.getmaxyx()
+                        blank_line = " " * (max_w_fixed - 2)
+                        last_log = None  # the bottom log row moved, start a fresh one
+                        # stdscr is never cleared, that would blank the terminal before the repaint and flicker.
+                        # It is only staged, so getch's implicit refresh can't paint the resized, blank stdscr
+                        # over both windows.
+                        stdscr.noutrefresh()
+                        fixed_info_win.erase()  # all of it is redrawn on the next tick
+                        fixed_info_win.box()
+                        safe_addstr(fixed_info_win, 0, 2, " Printer Status ")
+                        log_win.box()
+                        safe_addstr(log_win, 0, 2, " Logs ")
+                        # The terminal may have reflowed what was on screen, so the next update repaints both
+                        # windows in full
+                        fixed_info_win.redrawwin()
+                        log_win.redrawwin()
+                        needs_redraw_fixed = True
+                        log_win.noutrefresh()  # goes out with the status box in the next tick's doupdate
+                        log_body = log_win.derwin(log_height - 2, width - 2, 1, 1)
+                        log_body.idlok(True)
+                        log_h, log_w = log_body.getmaxyx()
                     except curses.error:
                         pass
-                    display_line = log_entry_to_add[:current_log_w - 2]
-                    safe_addstr(log_win, add_y, add_x, display_line)
-                    log_win.box()
-                    safe_addstr(log_win, 0, 2, " Logs ")
-                    log_win.refresh()
-                log_entry_to_add = None
+                    continue
+
+                log_entries = []
+                try:
+                    now = time.monotonic()
+                    if ws is None and now >= reconnect_at:
+                        try:
+                            ws = create_connection(ws_url, timeout=RECONNECT_TIMEOUT)
+                        except (WebSocketException, OSError) as e:
+                            backoff = min(backoff * 2, RECONNECT_MAX)
+                            reconnect_at = now + backoff
+                            log_entries.append(f"Reconnect failed, retrying in {backoff}s: {e}")
+                        else:
+                            ws.settimeout(10)
+                            ws_sock = ws.sock
+                            sel.register(ws_sock, selectors.EVENT_READ)
+                            backoff = RECONNECT_MIN
+                            last_activity = now = time.monotonic()
+                            ping_sent = None
+                            status_text = "Connected"
+                            log_entries.append("Reconnected")
+                    readable = ws is not None and any(k.fileobj is ws_sock for k, _ in ready)
+                    frames = []
+                    # Drain every frame that is already waiting, so a burst costs one update and one redraw
+                    while readable and len(frames) < MAX_BATCH:
+                        # control_frame=True also returns pongs, so they count as signs of life
+                        opcode, payload = ws.recv_data(control_frame=True)
+                        last_activity = now
+                        ping_sent = None
+                        if opcode == ABNF.OPCODE_CLOSE:
+                            raise WebSocketConnectionClosedException("Connection closed by the printer")
+                        if opcode == ABNF.OPCODE_TEXT and payload:
+                            frames.append(payload)  # raw UTF-8 bytes, the parser takes them as they are
+                        readable, _, _ = select.select([ws.sock], [], [], 0)
+                    if not frames and ws is not None:
+                        if ping_sent is None and now - last_activity >= PING_INTERVAL:
+                            ws.ping()
+                            ping_sent = now
+                        elif ping_sent is not None and now - ping_sent >= PONG_TIMEOUT:
+                            raise WebSocketConnectionClosedException("Printer stopped responding")
+
+                    # Messages are partial updates, so merge them and keep the newest value of each key
+                    latest = {}
+                    for msg in frames:
+                        log_entries.append(msg)
+                        if msg == last_msg:
+                            # Repeated heartbeat: same state as the frame before, nothing to parse
+                            continue
+                        if len(msg) < 3 or msg[0] not in OBJECT_START:
+                            continue
+                        try:
+                            data = json_loads(msg)
+                        except ValueError:  # JSONDecodeError from either parser; invalid UTF-8 never gets here
+                            log_entries[-1] = b"Malformed JSON: " + msg
+                            continue
+                        # Only once it parsed, so a malformed frame sent twice is flagged both times
+                        last_msg = msg
+                        if isinstance(data, dict):
+                            latest.update(data)
+
+                    if latest:
+                        # Only touch the fields present in this batch; each is converted and formatted once,
+                        # and only when its value actually changed
+                        for json_key, info_key, convert, fmt in update_table:
+                            if json_key in latest:
+                                value = convert(latest[json_key], raw_info_cache[info_key])
+                                if value == raw_info_cache[info_key]:
+                                    continue
+                                raw_info_cache[info_key] = value
+                                text = fmt(value)
+                                if formatted_info[info_key] != text:
+                                    formatted_info[info_key] = text
+                                    dirty.add(info_key)
+                except WebSocketTimeoutException:
+                    # A frame started arriving but didn't complete in time; carry on with the next one
+                    log_entries.append("WebSocket timeout while receiving")
+                except (WebSocketException, OSError) as e:
+                    # A dead connection would otherwise be "readable" forever and spin the loop, and after a
+                    # protocol or payload error (illegal frame, invalid UTF-8 text) the stream can't be trusted
+                    # either. Drop it and let the top of the loop reconnect once the backoff has passed.
+                    if ws is not None:
+                        sel.unregister(ws_sock)
+                        ws.shutdown()
+                        ws = None
+                    reconnect_at = time.monotonic() + backoff
+                    status_text = "Reconnecting..."
+                    log_entries.append(f"Connection lost, reconnecting in {backoff}s: {e}")
+
+                # Both windows are staged with noutrefresh and sent to the terminal in one doupdate
+                staged = False
+                if needs_redraw_fixed or dirty or drawn_status != status_text:
+                    value_col = 2 + label_width
+                    value_width = max_w_fixed - 1 - value_col
+                    if needs_redraw_fixed or drawn_status != status_text:
+                        addstr_clipped(fixed_info_win, max_h_fixed, max_w_fixed, status_line_y, 1, f" Status: {status_text}".ljust(max_w_fixed - 2)[:max_w_fixed - 2])
+                        drawn_status = status_text
+                    if needs_redraw_fixed:
+                        # Fresh window: the labels never change, draw them once
+                        for key in info_keys:
+                            addstr_clipped(fixed_info_win, max_h_fixed - 1, max_w_fixed, info_rows[key], 1, " " + f"{key}:".ljust(label_width))
+                        dirty.update(info_keys)
+                    # Only repaint the values that changed, padded to blank the old text
+                    if value_width > 0:
+                        for key in dirty:
+                            addstr_clipped(fixed_info_win, max_h_fixed - 1, max_w_fixed, info_rows[key], value_col, formatted_info[key].ljust(value_width)[:value_width])
+                    fixed_info_win.noutrefresh()
+                    staged = True
+                    needs_redraw_fixed = False
+                    dirty.clear()
+
+                if log_entries:
+                    # Collapse runs of identical lines into one "line (xN)" row; the printer repeats its
+                    # heartbeat frame over and over. A run can continue the bottom row from the last tick.
+                    continues = log_entries[0] == last_log
+                    runs = [[last_log, log_repeats]] if continues else []
+                    for entry in log_entries:
+                        if runs and runs[-1][0] == entry:
+                            runs[-1][1] += 1
+                        else:
+                            runs.append([entry, 1])
+                    last_log, log_repeats = runs[-1]
+
+                    if log_h >= 1 and log_w >= 2:
+                        add_y = log_h - 1
+                        line_width = log_w
+                        # Lines older than the window height would scroll straight out again
+                        visible = runs[-log_h:]
+                        rewrite_first = continues and len(visible) == len(runs)
+                        for i, (entry, count) in enumerate(visible):
+                            try:
+                                if i > 0 or not rewrite_first:
+                                    # Drop the top line rather than scrollok, which would also scroll
+                                    # after a full-width write to the last row
+                                    log_body.move(0, 0)
+                                    log_body.deleteln()
+                                log_body.move(add_y, 0)
+                                log_body.clrtoeol()
+                            except curses.error:
+                                pass
+                            display_line = entry[:line_width]
+                            if isinstance(display_line, bytes):
+                                # Only the visible part of a message is ever decoded
+                                display_line = display_line.decode("utf-8", "replace")
+                            if count > 1:
+                                suffix = f" (x{count})"
+                                display_line = display_line[:max(0, line_width - len(suffix))] + suffix
+                            # Filling the last cell raises even though it is written, addstr_clipped ignores that
+                            addstr_clipped(log_body, log_h, log_w, add_y, 0, display_line)
+                        log_body.noutrefresh()
+                        staged = True
 
-            curses.napms(50)
+                if staged:
+                    curses.doupdate()
+        except KeyboardInterrupt:
+            safe_addstr(fixed_info_win, 2, 1, blank_line)
+            safe_addstr(fixed_info_win, 2, 1, " Stopping...")
+            fixed_info_win.refresh()
+            time.sleep(0.5)
 
+        sel.close()
         if ws and ws.connected:
             ws.close()
 
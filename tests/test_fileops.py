@@ -0,0 +1,28 @@
+import unittest
+
+from fileops import has_file
+
+FILE_INFO = ("/usr/data/printer_data/gcodes:benchy.gcode:1048576:0.2:1700000000:1234;"
+             "/usr/data/printer_data/gcodes:cube.gcode:2048:0.16:1700000100:56;")
+
+
+class HasFileTest(unittest.TestCase):
+    def test_existing_names(self):
+        self.assertTrue(has_file(FILE_INFO, "benchy.gcode"))
+        self.assertTrue(has_file(FILE_INFO, "cube.gcode"))
+
+    def test_name_equal_to_a_numeric_field(self):
+        # ":0.2:", ":1048576:" and ":1700000000:" all appear in the listing, but not as names
+        for name in ("0.2", "1048576", "1700000000", "2048"):
+            self.assertFalse(has_file(FILE_INFO, name))
+
+    def test_partial_name(self):
+        self.assertFalse(has_file(FILE_INFO, "benchy"))
+        self.assertFalse(has_file(FILE_INFO, "Benchy.gcode"))
+
+    def test_empty_listing(self):
+        self.assertFalse(has_file("", "benchy.gcode"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import time
+import unittest
+
+from media import iter_stream_frames
+
+
+class FakeStream:
+    # Stands in for the streamed requests response: the test writes parts into a pipe at its own pace
+    def __init__(self, boundary=b"boundarydonotcross"):
+        read_fd, self.write_fd = os.pipe()
+        self.raw = os.fdopen(read_fd, "rb")
+        self.headers = {"Content-Type": "multipart/x-mixed-replace;boundary=" + boundary.decode()}
+        self.boundary = boundary
+
+    def send(self, data, with_length=True):
+        headers = b"Content-Type: image/jpeg\r\n"
+        if with_length:
+            headers += b"Content-Length: %d\r\n" % len(data)
+        os.write(self.write_fd, b"--" + self.boundary + b"\r\n" + headers + b"\r\n" + data + b"\r\n")
+
+    def end(self):
+        os.close(self.write_fd)
+
+    def close(self):
+        self.raw.close()
+
+
+class StreamFramesTest(unittest.TestCase):
+    def test_slow_consumer_gets_newest_frame(self):
+        stream = FakeStream()
+        frames = iter_stream_frames(stream, 0)
+        for i in range(50):
+            stream.send(b"frame %d" % i)
+        time.sleep(0.3)  # the consumer is busy while the camera keeps sending
+        self.assertEqual(next(frames), b"frame 49")
+        for i in range(50, 60):
+            stream.send(b"frame %d" % i)
+        time.sleep(0.3)
+        self.assertEqual(next(frames), b"frame 59")
+        stream.end()
+        self.assertEqual(list(frames), [])
+
+    def test_parts_without_content_length(self):
+        stream = FakeStream()
+        frames = iter_stream_frames(stream, 0)
+        stream.send(b"first\r\nline two", with_length=False)
+        stream.send(b"second", with_length=False)  # its delimiter closes the first part
+        time.sleep(0.3)
+        self.assertEqual(next(frames), b"first\r\nline two")
+        stream.send(b"third", with_length=False)
+        time.sleep(0.3)
+        self.assertEqual(next(frames), b"second")
+        stream.end()
+        self.assertEqual(list(frames), [])  # the last part was cut off by the end of the stream
+
+
+if __name__ == "__main__":
+    unittest.main()
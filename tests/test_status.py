@@ -0,0 +1,38 @@
+import unittest
+
+from fileops import json_loads
+from status import PROGRESS_TEXT, format_duration, format_progress
+
+
+class FormatBogusValuesTest(unittest.TestCase):
+    # Printer frames are parsed as they come; none of these values may take the UI down
+
+    def test_progress_huge_value(self):
+        data = json_loads(b'{"printProgress": 1e300}')
+        self.assertEqual(format_progress(data["printProgress"]), PROGRESS_TEXT[100])
+        self.assertEqual(format_progress(10 ** 400), "N/A")  # too big to even be a float
+
+    def test_progress_nan_and_infinity(self):
+        for val in (float("nan"), float("inf"), float("-inf")):
+            self.assertEqual(format_progress(val), "N/A")
+
+    def test_progress_clamped_to_range(self):
+        self.assertEqual(format_progress(250), PROGRESS_TEXT[100])
+        self.assertEqual(format_progress(-3), PROGRESS_TEXT[0])
+        self.assertEqual(format_progress(42.7), PROGRESS_TEXT[42])
+
+    def test_duration_huge_value(self):
+        self.assertEqual(format_duration(1e300), "N/A")
+        self.assertEqual(format_duration(10 ** 400), "N/A")
+
+    def test_duration_nan_and_infinity(self):
+        for val in (float("nan"), float("inf"), float("-inf")):
+            self.assertEqual(format_duration(val), "N/A")
+
+    def test_duration_normal_and_negative(self):
+        self.assertEqual(format_duration(3725), "01:02:05")
+        self.assertEqual(format_duration(-1), "N/A")
+
+
+if __name__ == "__main__":
+    unittest.main()